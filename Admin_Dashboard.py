@@ -1,6 +1,15 @@
+import math
+from datetime import datetime, timedelta
+import numpy as np
 import streamlit as st
 import pandas as pd
-from database import get_all_visits
+from async_database import run, get_visit_kpis
+from database import count_photos, get_photo_page, get_visit_details, get_visit_image
+from photos import decode_image, make_thumbnail
+from visit_map import MIN_ZOOM, MAX_ZOOM, cell_size_m, get_visit_clusters
+from route_analytics import get_daily_routes, refresh_daily_routes
+from visit_snapshot import get_visit_snapshot
+from search import search_visits
 from login_manager import require_auth, logout
 
 st.set_page_config(page_title="Admin Dashboard", page_icon="🔒", layout="wide")
@@ -19,42 +28,169 @@ with st.sidebar:
     if st.button("Logout"):
         logout()
 
+PHOTOS_PER_PAGE = 12
+VISITS_PER_PAGE = 50
+SEARCH_RESULTS_PER_PAGE = 20
+
+# Cached per image hash: a re-uploaded photo gets a new key, unchanged ones are never re-fetched.
+@st.cache_data(max_entries=1000, show_spinner=False)
+def load_thumbnail(visit_id, image_hash):
+    _, image_data = get_visit_image(visit_id)
+    return make_thumbnail(decode_image(image_data))
+
+@st.cache_data(max_entries=20, show_spinner=False)
+def load_full_image(visit_id, image_hash):
+    _, image_data = get_visit_image(visit_id)
+    return decode_image(image_data)
+
+def visits_table(view, details):
+    """Table/CSV rows for snapshot rows `view` (see VisitSnapshot.newest_first), with display-only fields from `details`."""
+    detail = [details.get(int(i)) for i in view["id"]]
+    return pd.DataFrame({
+        "ID": view["id"].to_numpy(),
+        "Date": view["visit_at"].dt.date.to_numpy(),
+        "Time": view["visit_at"].dt.time.to_numpy(),
+        "SR Name": view["sr_name"].to_numpy(),
+        "Store": view["store_name"].to_numpy(),
+        "Type": view["visit_type"].to_numpy(),
+        "Category": view["store_category"].to_numpy(),
+        "Phone": [d.phone_number if d else None for d in detail],
+        "Lead": view["lead_type"].to_numpy(),
+        "Products": [d.products if d else None for d in detail],
+        "Lat": view["latitude"].to_numpy(),
+        "Lon": view["longitude"].to_numpy(),
+        "Map": [d.maps_url if d else None for d in detail],
+    })
+
 st.title("📊 Admin Dashboard")
-st.subheader("All Store Visits")
-
-visits = get_all_visits()
-
-if visits:
-    # Convert SQLAlchemy objects to Dictionary for DataFrame
-    data = []
-    for v in visits:
-        data.append({
-            "ID": v.id,
-            "Date": v.visit_date,
-            "Time": v.visit_time,
-            "SR Name": v.sr_name,
-            "Store": v.store_name,
-            "Type": v.visit_type,
-            "Category": v.store_category,
-            "Phone": v.phone_number,
-            "Lead": v.lead_type,
-            "Products": v.products,
-            "Lat": v.latitude,
-            "Lon": v.longitude,
-            "Map": v.maps_url
-        })
-    
-    df = pd.DataFrame(data)
-    st.dataframe(df, use_container_width=True)
-
-    # Export Button
-    csv = df.to_csv(index=False).encode('utf-8')
-    st.download_button(
-        "📥 Download CSV",
-        csv,
-        "store_visits_export.csv",
-        "text/csv",
-        key='download-csv'
-    )
-else:
-    st.info("No records found in the database.")
+
+kpis = run(get_visit_kpis())
+# The visits table, charts and SR pickers all run on the shared typed snapshot rather than on ORM objects
+try:
+    snapshot = get_visit_snapshot()
+except Exception as e:
+    snapshot = None
+    st.warning(f"⚠️ Visit data unavailable: {e}")
+sr_options = sorted(snapshot.frame["sr_name"].dropna().unique()) if snapshot is not None else []
+
+k1, k2, k3, k4 = st.columns(4)
+k1.metric("Total Visits", kpis["total_visits"])
+k2.metric("Visits Today", kpis["visits_today"])
+k3.metric("HOT Leads", kpis["hot_leads"])
+k4.metric("Stores", kpis["stores"])
+
+tab_visits, tab_photos, tab_map, tab_routes, tab_search = st.tabs(["📋 Visits", "📸 Photos", "🗺️ Map", "🚗 Routes", "🔎 Search"])
+
+with tab_visits:
+    if snapshot is not None and not snapshot.frame.empty:
+        st.subheader("Lead Mix by SR")
+        st.bar_chart(snapshot.frame.groupby(["sr_name", "lead_type"], observed=True).size().unstack(fill_value=0))
+
+        st.subheader("All Store Visits")
+        view = snapshot.newest_first()
+        pages = math.ceil(len(view) / VISITS_PER_PAGE)
+        visits_page = st.number_input("Page", min_value=1, max_value=pages, value=1, key="visits_page")
+        st.caption(f"{len(view)} visit(s) · page {visits_page} of {pages}")
+
+        # Phone numbers, products and map links are only loaded for the visible page
+        page_rows = view.iloc[(visits_page - 1) * VISITS_PER_PAGE:visits_page * VISITS_PER_PAGE]
+        st.dataframe(visits_table(page_rows, get_visit_details(page_rows["id"])), hide_index=True, use_container_width=True)
+
+        # ...and for every visit only when an export is asked for
+        if st.button("📄 Prepare CSV export", key="prepare-csv"):
+            csv = visits_table(view, get_visit_details(view["id"])).to_csv(index=False).encode('utf-8')
+            st.download_button(
+                "📥 Download CSV",
+                csv,
+                "store_visits_export.csv",
+                "text/csv",
+                key='download-csv'
+            )
+    else:
+        st.info("No records found in the database.")
+
+with tab_photos:
+    st.subheader("Photo Review")
+    sr_filter = st.selectbox("SR", ["All"] + sr_options, key="photo_sr")
+    sr_name = None if sr_filter == "All" else sr_filter
+
+    total_photos = count_photos(sr_name)
+    if total_photos:
+        pages = math.ceil(total_photos / PHOTOS_PER_PAGE)
+        page_no = st.number_input("Page", min_value=1, max_value=pages, value=1, key="photo_page")
+        st.caption(f"{total_photos} photo(s) · page {page_no} of {pages}")
+
+        # Only the visible page is fetched, and only thumbnails not already cached hit the database
+        rows = get_photo_page((page_no - 1) * PHOTOS_PER_PAGE, PHOTOS_PER_PAGE, sr_name)
+        cols = st.columns(4)
+        for i, row in enumerate(rows):
+            with cols[i % 4]:
+                st.image(load_thumbnail(row.id, row.image_hash), caption=f"{row.store_name} · {row.sr_name} · {row.visit_date}")
+                if st.button("View full size", key=f"photo_{row.id}"):
+                    st.session_state.photo_full = (row.id, row.image_hash)
+
+        if st.session_state.get("photo_full"):
+            st.markdown("---")
+            st.image(load_full_image(*st.session_state.photo_full), caption=f"Visit #{st.session_state.photo_full[0]}")
+    else:
+        st.info("No photos found.")
+
+with tab_map:
+    st.subheader("Visit Coverage")
+    m1, m2, m3 = st.columns(3)
+    today = datetime.now().date()
+    date_range = m1.date_input("Date range", value=(today - timedelta(days=30), today), key="map_dates")
+    map_sr = m2.selectbox("SR", ["All"] + sr_options, key="map_sr")
+    zoom = m3.slider("Detail (zoom level)", min_value=MIN_ZOOM, max_value=MAX_ZOOM, value=11, key="map_zoom")
+
+    date_from, date_to = (date_range + (None, None))[:2] if isinstance(date_range, tuple) else (date_range, None)
+    clusters = get_visit_clusters(zoom, date_from, date_to, None if map_sr == "All" else map_sr)
+    if not clusters.empty:
+        # Marker radius grows with the number of visits in the cell, up to half a cell
+        radius = cell_size_m(zoom, clusters["latitude"].mean()) / 2
+        markers = clusters.assign(size=radius * (0.3 + 0.7 * np.sqrt(clusters["count"] / clusters["count"].max())))
+        st.map(markers, latitude="latitude", longitude="longitude", size="size")
+        st.caption(f"{int(clusters['count'].sum())} visit(s) in {len(clusters)} cluster(s)")
+    else:
+        st.info("No located visits in this range.")
+
+with tab_routes:
+    st.subheader("SR Daily Routes")
+    ok, msg = refresh_daily_routes()  # Incremental: only SR-days with new visits are recomputed
+    if not ok:
+        st.warning(f"⚠️ Could not refresh routes, showing the last saved figures: {msg}")
+    route_from = st.date_input("From", value=today - timedelta(days=14), key="routes_from")
+    routes = get_daily_routes(date_from=route_from)
+    if not routes.empty:
+        per_sr = routes.groupby("sr_name").agg(
+            days=("visit_date", "nunique"),
+            visits=("visits", "sum"),
+            distance_km=("distance_km", "sum"),
+            avg_gap_min=("mean_gap_min", "mean"),
+        ).round(1)
+        st.dataframe(per_sr, use_container_width=True)
+        st.bar_chart(routes.pivot_table(index="visit_date", columns="sr_name", values="distance_km", aggfunc="sum"))
+        with st.expander("Daily detail"):
+            st.dataframe(routes.drop(columns=["refreshed_at"]).round(2), hide_index=True, use_container_width=True)
+    else:
+        st.info("No route data in this range.")
+
+with tab_search:
+    st.subheader("Search Visits")
+    search_query = st.text_input("Search store names and order details", key="search_query", placeholder="e.g. hookah refill")
+    if search_query:
+        search_page = st.session_state.get("search_page", 1)
+        total_hits, hits = search_visits(search_query, page=search_page, page_size=SEARCH_RESULTS_PER_PAGE)
+        if total_hits:
+            search_pages = math.ceil(total_hits / SEARCH_RESULTS_PER_PAGE)
+            if search_page > search_pages:
+                # A new query with fewer results than the page we were on
+                st.session_state.search_page = 1
+                st.rerun()
+            st.caption(f"{total_hits} match(es)")
+            for hit in hits:
+                st.markdown(f"**#{hit['id']} · {hit['store_name']}** — {hit['sr_name']}, {hit['visit_date']}  \n{hit['snippet']}")
+            if search_pages > 1:
+                st.number_input("Page", min_value=1, max_value=search_pages, key="search_page")
+        else:
+            st.info("No matches.")
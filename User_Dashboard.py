@@ -1,7 +1,9 @@
 import streamlit as st
 import pandas as pd
-from database import get_visits_by_user, update_lead_status
+from database import get_visit_details, update_lead_statuses, get_due_follow_ups
 from login_manager import require_auth, logout
+from route_analytics import get_daily_routes, refresh_daily_routes
+from visit_snapshot import get_visit_snapshot
 
 st.set_page_config(page_title="User Dashboard", page_icon="📊", layout="wide")
 
@@ -17,23 +19,43 @@ with st.sidebar:
 
 st.title("📊 My Lead Dashboard")
 
-# Fetch Data
-visits = get_visits_by_user(user['username'])
-
-if visits:
-    # Prepare Data
-    data = []
-    for v in visits:
-        data.append({
-            "ID": v.id,
-            "Date": v.visit_date,
-            "Store": v.store_name,
-            "Phone": v.phone_number,
-            "Lead Status": v.lead_type,
-            "Category": v.store_category,
-            "Follow-up": v.follow_up_date
-        })
-    df = pd.DataFrame(data)
+# --- Follow-ups due today or overdue ---
+due = get_due_follow_ups(user['username'])
+if due:
+    st.subheader(f"📅 Follow-ups Due ({len(due)})")
+    st.dataframe(pd.DataFrame([{
+        "Due": v.follow_up_on,
+        "Store": v.store_name,
+        "Phone": v.phone_number,
+        "Lead Status": v.lead_type,
+        "Last Visit": v.visit_date
+    } for v in due]), hide_index=True, use_container_width=True)
+
+# Fetch Data: this user's rows of the shared visit snapshot (refreshed right after their own saves)
+try:
+    snapshot = get_visit_snapshot(sticky_key=user['username'])
+    visits = snapshot.newest_first(snapshot.frame["username"] == user['username'])
+except Exception as e:
+    visits = None
+    st.warning(f"⚠️ Visit data unavailable: {e}")
+
+if visits is not None and not visits.empty:
+    # Prepare Data; phone numbers and free-text follow-up dates are not in the snapshot
+    details = get_visit_details(visits["id"], sticky_key=user['username'])
+    detail = [details.get(int(i)) for i in visits["id"]]
+    df = pd.DataFrame({
+        "ID": visits["id"].to_numpy(),
+        "Date": visits["visit_at"].dt.date.to_numpy(),
+        "Store": visits["store_name"].to_numpy(),
+        "Phone": [d.phone_number if d else None for d in detail],
+        "Lead Status": visits["lead_type"].to_numpy(),
+        "Category": visits["store_category"].to_numpy(),
+        "Follow-up": [
+            on.date() if pd.notna(on) else (d.follow_up_date if d else None)
+            for on, d in zip(visits["follow_up_on"], detail)
+        ],
+        "Version": visits["version"].to_numpy(),
+    })
 
     # --- Charts ---
     st.subheader("Lead Status Overview")
@@ -51,6 +73,17 @@ if visits:
     st.subheader("🏷️ Manage Your Leads")
     st.info("💡 You can change the Lead Status in the table below and click 'Save Changes'.")
 
+    # Result of the last save, kept across the rerun that reloads the table
+    saved = st.session_state.pop("lead_save_result", None)
+    if saved:
+        if saved["updated"]:
+            st.success(f"✅ {saved['updated']} lead(s) updated successfully!")
+        for c in saved["conflicts"]:
+            if c["lead_type"] is None:
+                st.warning(f"⚠️ {c['store']}: this visit no longer exists (it may have been archived). Your edit was not applied.")
+            else:
+                st.warning(f"⚠️ {c['store']}: changed elsewhere to {c['lead_type']} before your save. Your edit was not applied; the table now shows the current status.")
+
     # Use data_editor for interactive updates
     edited_df = st.data_editor(
         df,
@@ -59,7 +92,8 @@ if visits:
                 "Lead Status",
                 options=["HOT", "WARM", "COLD", "DEAD"],
                 required=True,
-            )
+            ),
+            "Version": None
         },
         disabled=["ID", "Date", "Store", "Phone", "Category", "Follow-up"],
         hide_index=True,
@@ -68,25 +102,45 @@ if visits:
     )
 
     if st.button("💾 Save Changes"):
-        updated_count = 0
-        # Compare edited_df with df to find changes
-        for i, row in edited_df.iterrows():
-            original_status = df.iloc[i]['Lead Status']
-            new_status = row['Lead Status']
-            if original_status != new_status:
-                ok, msg = update_lead_status(row['ID'], new_status)
-                if ok:
-                    updated_count += 1
-        
-        if updated_count > 0:
-            st.success(f"✅ {updated_count} lead(s) updated successfully!")
-            st.rerun()
+        # Compare edited_df with df to find changes; each carries the version it was loaded at
+        changes = [
+            {"visit_id": int(row['ID']), "old_status": df.iloc[i]['Lead Status'], "new_status": row['Lead Status'], "version": int(row['Version'])}
+            for i, row in edited_df.iterrows()
+            if df.iloc[i]['Lead Status'] != row['Lead Status']
+        ]
+
+        if changes:
+            ok, result = update_lead_statuses(changes, changed_by=user['username'])
+            if ok:
+                stores = dict(zip(df['ID'], df['Store']))
+                st.session_state.lead_save_result = {
+                    "updated": len(result["updated"]),
+                    "conflicts": [dict(c, store=stores.get(c["visit_id"], c["visit_id"])) for c in result["conflicts"]],
+                }
+                st.rerun()
+            else:
+                st.error(f"❌ Database Error: {result}")
         else:
             st.info("No changes to save.")
 
+    # --- Travel ---
+    ok, msg = refresh_daily_routes()
+    if not ok:
+        st.warning(f"⚠️ Could not refresh travel stats, showing the last saved figures: {msg}")
+    routes = get_daily_routes(username=user['username'])
+    if not routes.empty:
+        st.markdown("---")
+        st.subheader("🚗 My Travel")
+        latest = routes.iloc[0]
+        t1, t2, t3 = st.columns(3)
+        t1.metric(f"Distance on {latest['visit_date']}", f"{latest['distance_km']:.1f} km")
+        t2.metric("Visits", int(latest['visits']))
+        t3.metric("Avg gap", f"{latest['mean_gap_min']:.0f} min" if pd.notna(latest['mean_gap_min']) else "-")
+        st.line_chart(routes.head(30).set_index("visit_date")[["distance_km"]])
+
     # Details Table
     with st.expander("View Full Visit Details"):
-        st.table(df)
+        st.table(df.drop(columns=["Version"]))
 
 else:
     st.info("You haven't entered any visit reports yet.")
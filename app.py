@@ -11,7 +11,7 @@ from PIL import Image
 import streamlit.components.v1 as components
 from streamlit_js_eval import streamlit_js_eval
 from streamlit_geolocation import streamlit_geolocation
-from database import init_db, save_visit, get_all_store_names, get_last_visit_by_store, update_lead_status
+from database import init_db, save_visit, get_all_store_names, get_last_visit_by_store, update_lead_status, visit_products
 from .login_manager import require_auth, logout
 
 # --- Authentication ---
@@ -65,7 +65,7 @@ def load_store_data():
     # But usually, this callback is for the selectbox.
     
     if selected and selected != "Create New / Search...":
-        visit = get_last_visit_by_store(selected)
+        visit = get_last_visit_by_store(selected, sticky_key=user['username'])
         if visit:
             st.session_state.store_name = visit.store_name
             st.session_state.sr_name = visit.sr_name
@@ -83,8 +83,8 @@ def load_store_data():
             
             st.session_state.lead_type = visit.lead_type
             
-            # Map products string back to booleans
-            prods = visit.products if visit.products else ""
+            # Map product tags back to booleans
+            prods = set(visit_products(visit))
             st.session_state.p1 = "CIGARETTE" in prods
             st.session_state.p2 = "ROLLING PAPERS" in prods
             st.session_state.p3 = "CIGARS" in prods
@@ -126,7 +126,7 @@ st.title("DAILY REPORT")
 # --- Main Form Container ---
 with st.container():
     # Fetch existing stores for the dropdown
-    existing_stores = get_all_store_names()
+    existing_stores = get_all_store_names(sticky_key=user['username'])
     
     # Search Box with Callback
     st.selectbox(
@@ -148,7 +148,7 @@ with st.container():
     def handle_visit_type_change():
         if st.session_state.visit_type == "RE VISIT" and st.session_state.store_name:
             # Check if this name exists in DB
-            visit = get_last_visit_by_store(st.session_state.store_name)
+            visit = get_last_visit_by_store(st.session_state.store_name, sticky_key=user['username'])
             if visit:
                 st.session_state.sr_name = visit.sr_name
                 st.session_state.phone = visit.phone_number
@@ -164,7 +164,7 @@ with st.container():
                     
                 st.session_state.lead_type = visit.lead_type
                 
-                prods = visit.products if visit.products else ""
+                prods = set(visit_products(visit))
                 st.session_state.p1 = "CIGARETTE" in prods
                 st.session_state.p2 = "ROLLING PAPERS" in prods
                 st.session_state.p3 = "CIGARS" in prods
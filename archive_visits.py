@@ -0,0 +1,19 @@
+"""
+Moves old visits from store_visits into store_visits_archive (see database.archive_old_visits).
+
+Run once:        python archive_visits.py [days]
+Nightly (cron):  0 2 * * *  cd /path/to/app && ARCHIVE_PARQUET_DIR=/data/visit_archive python archive_visits.py
+
+Defaults to ARCHIVE_AFTER_DAYS; set ARCHIVE_PARQUET_DIR to also keep Parquet copies.
+Exits non-zero if a batch fails, so cron reports it; the next run picks up where it stopped.
+"""
+import sys
+
+from database import archive_old_visits, init_db
+
+if __name__ == "__main__":
+    init_db()
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    ok, msg = archive_old_visits(days=days)
+    print(msg)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,164 @@
+"""
+Async versions of the read helpers in database.py.
+
+Independent queries can be awaited together with gather(), so a page that needs
+several of them costs the time of the slowest query instead of their sum.
+Streamlit scripts are synchronous, so they call run() which executes a coroutine on
+a single background event loop shared by all sessions (the async engines and their
+connection pools are bound to that loop).
+"""
+import asyncio
+import threading
+from datetime import datetime
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import defer, selectinload
+
+from database import DATABASE_URL, DATABASE_READ_URLS, StoreVisit, StoreVisitArchive, mark_replica_down, pick_replica
+
+# Async driver used for each backend (aiosqlite / asyncpg must be installed).
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def to_async_url(url):
+    """Rewrites a sync database URL to use the matching async driver."""
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme.split('+')[0], scheme)}://{rest}"
+
+def _create_async_engine(url):
+    return create_async_engine(to_async_url(url))
+
+async_engine = _create_async_engine(DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+_async_read_sessions = [async_sessionmaker(_create_async_engine(url), expire_on_commit=False) for url in DATABASE_READ_URLS]
+
+async def run_read(read, sticky_key=None):
+    """
+    Async counterpart of database.run_read(): awaits read(session) on a replica and, if that
+    fails, marks the replica down and re-runs it on the primary.
+    """
+    # pick_replica() may block on a replica health check, so it must not run on the shared loop
+    index = await asyncio.to_thread(pick_replica, sticky_key)
+    if index is not None:
+        try:
+            async with _async_read_sessions[index]() as session:
+                return await read(session)
+        except Exception:
+            mark_replica_down(index)
+    async with AsyncSessionLocal() as session:
+        return await read(session)
+
+# --- Event loop bridge ---
+_loop = None
+_loop_lock = threading.Lock()
+
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-db", daemon=True).start()
+        return _loop
+
+def run(coro):
+    """Runs a coroutine on the shared background loop and returns its result."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+async def gather(**queries):
+    """
+    Awaits independent queries concurrently.
+    Usage: await gather(stores=get_all_store_names(), kpis=get_visit_kpis())
+    Returns: dict with the same keys mapped to each query's result
+    """
+    results = await asyncio.gather(*queries.values())
+    return dict(zip(queries.keys(), results))
+
+# --- Queries ---
+async def get_all_visits(include_archive=False, sticky_key=None):
+    """Fetches all visits, newest first. See database.get_all_visits()."""
+    async def read(session):
+        result = await session.execute(
+            select(StoreVisit).options(defer(StoreVisit.image_data)).order_by(StoreVisit.visit_date.desc(), StoreVisit.visit_time.desc())
+        )
+        visits = list(result.scalars())
+        if include_archive:
+            archived = await session.execute(select(StoreVisitArchive).options(defer(StoreVisitArchive.image_data)))
+            visits += archived.scalars()
+            visits.sort(key=lambda v: (v.visit_date, v.visit_time), reverse=True)
+        return visits
+    try:
+        return await run_read(read, sticky_key)
+    except Exception:
+        return []
+
+async def get_all_store_names(include_archive=False, sticky_key=None):
+    """Returns a list of distinct store names."""
+    async def read(session):
+        stores = list((await session.execute(select(StoreVisit.store_name).distinct())).scalars())
+        if include_archive:
+            stores += (await session.execute(select(StoreVisitArchive.store_name).distinct())).scalars()
+        return list(dict.fromkeys(stores))
+    try:
+        return await run_read(read, sticky_key)
+    except Exception:
+        return []
+
+async def get_last_visit_by_store(store_name, include_archive=False, sticky_key=None):
+    """Returns the most recent visit for a given store name."""
+    async def read(session):
+        for model in (StoreVisit, StoreVisitArchive) if include_archive else (StoreVisit,):
+            query = select(model)
+            if model is StoreVisit:
+                query = query.options(selectinload(StoreVisit.product_tags))
+            result = await session.execute(
+                query.filter(model.store_name == store_name).order_by(model.visit_date.desc(), model.visit_time.desc()).limit(1)
+            )
+            visit = result.scalars().first()
+            if visit is not None:
+                return visit
+        return None
+    try:
+        return await run_read(read, sticky_key)
+    except Exception:
+        return None
+
+async def get_visits_by_user(username, include_archive=False):
+    """Fetches all visits for a specific user."""
+    async def read(session):
+        result = await session.execute(
+            select(StoreVisit).options(defer(StoreVisit.image_data)).filter(StoreVisit.username == username).order_by(StoreVisit.visit_date.desc(), StoreVisit.visit_time.desc())
+        )
+        visits = list(result.scalars())
+        if include_archive:
+            archived = await session.execute(
+                select(StoreVisitArchive).options(defer(StoreVisitArchive.image_data)).filter(StoreVisitArchive.username == username)
+            )
+            visits += archived.scalars()
+            visits.sort(key=lambda v: (v.visit_date, v.visit_time), reverse=True)
+        return visits
+    try:
+        return await run_read(read, username)
+    except Exception:
+        return []
+
+async def get_visit_kpis(username=None, sticky_key=None):
+    """
+    Returns headline counts for live visits in a single aggregate query.
+    Returns: dict with total_visits, visits_today, hot_leads and stores
+    """
+    empty = {"total_visits": 0, "visits_today": 0, "hot_leads": 0, "stores": 0}
+    query = select(
+        func.count(StoreVisit.id),
+        func.sum(case((StoreVisit.visit_date == datetime.now().date(), 1), else_=0)),
+        func.sum(case((StoreVisit.lead_type == "HOT", 1), else_=0)),
+        func.count(StoreVisit.store_name.distinct()),
+    )
+    if username:
+        query = query.filter(StoreVisit.username == username)
+    async def read(session):
+        row = (await session.execute(query)).one()
+        return dict(zip(empty.keys(), (value or 0 for value in row)))
+    try:
+        return await run_read(read, sticky_key or username)
+    except Exception:
+        return empty
@@ -0,0 +1,20 @@
+"""Helpers for reviewing visit photos stored as base64 data URIs in StoreVisit.image_data."""
+import base64
+from io import BytesIO
+
+from PIL import Image
+
+THUMBNAIL_SIZE = (240, 240)
+
+def decode_image(image_data):
+    """Returns the raw bytes of a 'data:image/...;base64,...' URI (or of bare base64)."""
+    _, _, payload = image_data.partition(",")
+    return base64.b64decode(payload or image_data)
+
+def make_thumbnail(image_bytes, size=THUMBNAIL_SIZE):
+    """Returns a JPEG thumbnail of the image no larger than `size`."""
+    img = Image.open(BytesIO(image_bytes))
+    img.thumbnail(size)
+    buffered = BytesIO()
+    img.convert("RGB").save(buffered, format="JPEG", quality=80)
+    return buffered.getvalue()
@@ -0,0 +1,83 @@
+"""
+Maps Google Form responses (the DAILY REPORT sheet / its xlsx export) to StoreVisit fields.
+
+map_responses() works column-wise on a DataFrame so it can convert whole pages of
+rows at once; it is shared by migrate_excel.py and sheet_sync.py.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from database import parse_follow_up_date
+
+# Sheet columns:
+# ['Timestamp', 'STORE NAME AND CONTACT PERSON', 'PHONE NUMBER', 'TIME', 'PHOTOGRAPH',
+#  'TOBACCO PRODUCTS INTERESTED IN/THEY DEAL IN', 'ORDER DETAILS IF CONVERTED',
+#  'CLICK THE LINK TO RECORD LOCATION. DID YOU RECORD THE LOCATION?', 'STORE CATEGORY',
+#  'SR NAME', 'REMARKS', 'LEAD TYPE', 'FOLLOW UP DATE', 'STORE VISIT TYPE', 'DATE',
+#  'ADMIN REMARKS', 'LATITUDE', 'LONGITUDE']
+STORE_COLUMN = 'STORE NAME AND CONTACT PERSON'
+PRODUCTS_COLUMN = 'TOBACCO PRODUCTS INTERESTED IN/THEY DEAL IN'
+LOCATION_COLUMN = 'CLICK THE LINK TO RECORD LOCATION. DID YOU RECORD THE LOCATION?'
+
+def _present(series):
+    """True where a cell has a value (not NaN/None and not blank)."""
+    return series.notna() & (series.astype(str).str.strip() != "") & (series.astype(str) != "None")
+
+def _text(df, column, default):
+    series = df[column] if column in df else pd.Series(None, index=df.index, dtype=object)
+    return series.astype(str).where(_present(series), default)
+
+def _number(df, column):
+    series = df[column] if column in df else pd.Series(None, index=df.index, dtype=object)
+    values = pd.to_numeric(series, errors="coerce")
+    # 0 was treated as "not recorded" by the original row-by-row import
+    return values.where(values != 0)
+
+def map_responses(df, default_username="sr_user", image_placeholder="Imported from Excel"):
+    """
+    Converts raw response rows to StoreVisit field values. Rows without a store name are dropped.
+    Returns: DataFrame whose columns are StoreVisit attribute names (index preserved)
+    """
+    df = df[_present(df[STORE_COLUMN])] if STORE_COLUMN in df else df.iloc[0:0]
+    now = datetime.now()
+
+    visit_date = pd.to_datetime(_text(df, 'DATE', None), format="mixed", errors="coerce")
+    visit_date = visit_date.fillna(pd.to_datetime(_text(df, 'Timestamp', None), format="mixed", errors="coerce"))
+    visit_date = visit_date.fillna(pd.Timestamp(now.date()))
+
+    # TIME holds 'HH:MM:SS' strings, time objects or full datetimes; pick out the clock part
+    clock = _text(df, 'TIME', "").str.extract(r'(\d{1,2}:\d{2}:\d{2})', expand=False)
+    visit_time = pd.to_datetime(clock, format="%H:%M:%S", errors="coerce").dt.time
+    visit_time = visit_time.where(visit_time.notna(), now.time().replace(microsecond=0))
+
+    latitude = _number(df, 'LATITUDE')
+    longitude = _number(df, 'LONGITUDE')
+    located = latitude.notna() & longitude.notna()
+
+    category = _text(df, 'STORE CATEGORY', "").str.upper()
+    follow_up = _text(df, 'FOLLOW UP DATE', None)
+
+    mapped = pd.DataFrame({
+        "visit_date": visit_date.dt.date,
+        "visit_time": visit_time,
+        "sr_name": _text(df, 'SR NAME', "Unknown"),
+        "username": default_username,
+        "store_name": df[STORE_COLUMN].astype(str) if STORE_COLUMN in df else pd.Series(dtype=object),
+        "visit_type": _text(df, 'STORE VISIT TYPE', "NEW VISIT"),
+        "store_category": np.where(category == "HORECA", "HoReCa", "MT"),
+        "phone_number": _text(df, 'PHONE NUMBER', ""),
+        "lead_type": _text(df, 'LEAD TYPE', "COLD"),
+        "follow_up_date": follow_up,
+        "follow_up_on": follow_up.map(parse_follow_up_date),
+        "products": _text(df, PRODUCTS_COLUMN, "NONE"),
+        "order_details": _text(df, 'ORDER DETAILS IF CONVERTED', ""),
+        "latitude": latitude,
+        "longitude": longitude,
+        "maps_url": ("https://www.google.com/maps?q=" + latitude.astype(str) + "," + longitude.astype(str)).where(located, ""),
+        "location_recorded_answer": _text(df, LOCATION_COLUMN, "NO"),
+        "image_data": image_placeholder,
+    }, index=df.index)
+    # NaN -> None so the frame can be handed straight to the ORM
+    return mapped.astype(object).where(mapped.notna(), None)
@@ -0,0 +1,137 @@
+"""
+Daily route analytics per SR: distance travelled, gaps between visits and visit rate.
+
+compute_daily_routes() works on whole columns with pandas group operations and NumPy,
+never row by row. refresh_daily_routes() materialises the results into sr_daily_routes
+and only recomputes the SR-days that received visits since the last refresh.
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, func, select
+
+from database import SessionLocal, SrDailyRoute, StoreVisit, get_watermark, has_valid_location, run_read, set_watermark
+
+WATERMARK_NAME = "sr_daily_routes"
+EARTH_RADIUS_KM = 6371.0088
+GROUP_KEYS = ["sr_name", "visit_date"]
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between arrays of points given in degrees."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+def compute_daily_routes(visits):
+    """
+    Summarises visits per SR-day.
+    visits: DataFrame with sr_name, username, visit_date, visit_time, latitude, longitude
+    Returns: DataFrame with one row per (sr_name, visit_date) matching SrDailyRoute
+    """
+    df = visits.copy()
+    # visit_time strings only carry microseconds when non-zero, so add it as a duration rather than parsing one format
+    df["ts"] = pd.to_datetime(df["visit_date"]) + pd.to_timedelta(df["visit_time"].astype(str))
+    # Out-of-range and placeholder coordinates count as "no GPS"
+    coords = df[["latitude", "longitude"]].apply(pd.to_numeric, errors="coerce")
+    df[["latitude", "longitude"]] = coords.where(has_valid_location(coords["latitude"], coords["longitude"]), axis=0)
+    df = df.sort_values(GROUP_KEYS + ["ts"], kind="stable")
+
+    # Gaps between consecutive visits of the same SR on the same day
+    df["gap_min"] = df.groupby(GROUP_KEYS, sort=False)["ts"].diff().dt.total_seconds() / 60
+
+    # Legs between consecutive *located* visits, so a visit without GPS does not break the route
+    located = df.dropna(subset=["latitude", "longitude"])
+    prev = located.groupby(GROUP_KEYS, sort=False)[["latitude", "longitude"]].shift()
+    legs = pd.Series(
+        haversine_km(prev["latitude"], prev["longitude"], located["latitude"], located["longitude"]),
+        index=located.index,
+    )
+    df["leg_km"] = legs.reindex(df.index)
+
+    routes = df.groupby(GROUP_KEYS, sort=False).agg(
+        username=("username", "first"),
+        visits=("ts", "size"),
+        located_visits=("latitude", "count"),
+        distance_km=("leg_km", "sum"),
+        first_ts=("ts", "min"),
+        last_ts=("ts", "max"),
+        mean_gap_min=("gap_min", "mean"),
+        max_gap_min=("gap_min", "max"),
+    ).reset_index()
+
+    routes["active_hours"] = (routes["last_ts"] - routes["first_ts"]).dt.total_seconds() / 3600
+    routes["visits_per_hour"] = routes["visits"] / routes["active_hours"].where(routes["active_hours"] > 0)
+    routes["first_visit"] = routes["first_ts"].dt.time
+    routes["last_visit"] = routes["last_ts"].dt.time
+    return routes.drop(columns=["first_ts", "last_ts"])
+
+def _load_visits(session, pairs=None):
+    """Loads the columns needed for routes, for all visits or only for the given (sr_name, visit_date) pairs."""
+    query = select(
+        StoreVisit.sr_name, StoreVisit.username, StoreVisit.visit_date,
+        StoreVisit.visit_time, StoreVisit.latitude, StoreVisit.longitude,
+    )
+    if pairs is not None:
+        query = query.where(
+            StoreVisit.visit_date.in_({d for _, d in pairs}),
+            StoreVisit.sr_name.in_({sr for sr, _ in pairs}),
+        )
+    df = pd.DataFrame(session.execute(query).all(), columns=["sr_name", "username", "visit_date", "visit_time", "latitude", "longitude"])
+    if pairs is not None and not df.empty:
+        # The IN filters above are a superset (cross product of SRs and dates); keep only the requested pairs
+        df = df[pd.MultiIndex.from_frame(df[GROUP_KEYS]).isin(list(pairs))]
+    return df
+
+def refresh_daily_routes(full=False):
+    """
+    Recomputes sr_daily_routes for SR-days with visits added since the last refresh
+    (or for everything when full=True). Days whose visits were archived keep their rows.
+    Returns: (bool, message)
+    """
+    session = SessionLocal()
+    try:
+        last_id = 0 if full else get_watermark(session, WATERMARK_NAME)
+        max_id = session.query(func.max(StoreVisit.id)).scalar() or 0
+        if max_id <= last_id:
+            return True, "Routes are up to date"
+
+        pairs = None
+        if not full:
+            pairs = set(session.execute(
+                select(StoreVisit.sr_name, StoreVisit.visit_date)
+                .where(StoreVisit.id > last_id, StoreVisit.id <= max_id)
+                .distinct()
+            ).all())
+        visits = _load_visits(session, pairs)
+        routes = compute_daily_routes(visits) if not visits.empty else pd.DataFrame(columns=GROUP_KEYS)
+
+        table = SrDailyRoute.__table__
+        for sr_name, visit_date in routes[GROUP_KEYS].itertuples(index=False):
+            session.execute(delete(table).where(table.c.sr_name == sr_name, table.c.visit_date == visit_date))
+        if not routes.empty:
+            records = routes.assign(refreshed_at=pd.Timestamp.now().to_pydatetime()).astype(object)
+            session.execute(table.insert(), records.where(records.notna(), None).to_dict("records"))
+        set_watermark(session, WATERMARK_NAME, max_id)
+        session.commit()
+        return True, f"Refreshed {len(routes)} SR-day(s)"
+    except Exception as e:
+        session.rollback()
+        return False, str(e)
+    finally:
+        session.close()
+
+def get_daily_routes(date_from=None, date_to=None, sr_name=None, username=None):
+    """Returns materialised SR-day routes as a DataFrame, newest first."""
+    query = select(SrDailyRoute)
+    if date_from:
+        query = query.where(SrDailyRoute.visit_date >= date_from)
+    if date_to:
+        query = query.where(SrDailyRoute.visit_date <= date_to)
+    if sr_name:
+        query = query.where(SrDailyRoute.sr_name == sr_name)
+    if username:
+        query = query.where(SrDailyRoute.username == username)
+    query = query.order_by(SrDailyRoute.visit_date.desc(), SrDailyRoute.sr_name)
+    try:
+        return run_read(lambda session: pd.read_sql(query, session.connection()), username)
+    except Exception:
+        return pd.DataFrame()
@@ -0,0 +1,114 @@
+"""
+Full-text search over visit store names and order details.
+
+SQLite uses an FTS5 table (store_visits_fts) over store_visits kept in sync by triggers;
+Postgres uses a generated tsvector column (search_vector) with a GIN index, which the
+database maintains on every insert/update. search_visits() hides the difference and returns
+ranked, paginated results with the matched text highlighted as **term**.
+"""
+import re
+
+from sqlalchemy import text
+
+from database import engine, run_read
+
+HIGHLIGHT_START, HIGHLIGHT_END = "**", "**"
+
+_SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS store_visits_fts USING fts5(
+        store_name, order_details,
+        content='store_visits', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS store_visits_fts_ai AFTER INSERT ON store_visits BEGIN
+        INSERT INTO store_visits_fts(rowid, store_name, order_details) VALUES (new.id, new.store_name, new.order_details);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS store_visits_fts_ad AFTER DELETE ON store_visits BEGIN
+        INSERT INTO store_visits_fts(store_visits_fts, rowid, store_name, order_details) VALUES ('delete', old.id, old.store_name, old.order_details);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS store_visits_fts_au AFTER UPDATE OF store_name, order_details ON store_visits BEGIN
+        INSERT INTO store_visits_fts(store_visits_fts, rowid, store_name, order_details) VALUES ('delete', old.id, old.store_name, old.order_details);
+        INSERT INTO store_visits_fts(rowid, store_name, order_details) VALUES (new.id, new.store_name, new.order_details);
+    END""",
+]
+
+# 'simple' config: order notes mix English, Hinglish and misspellings, so no stemming or stop words
+_POSTGRES_DDL = [
+    """ALTER TABLE store_visits ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(store_name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(order_details, '')), 'B')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_store_visits_search_vector ON store_visits USING GIN (search_vector)",
+]
+
+def ensure_search_index():
+    """Creates the full-text index for the current backend and fills it for existing visits."""
+    try:
+        with engine.begin() as conn:
+            if engine.dialect.name == "sqlite":
+                exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'store_visits_fts'")).first()
+                for ddl in _SQLITE_DDL:
+                    conn.execute(text(ddl))
+                if not exists:
+                    conn.execute(text("INSERT INTO store_visits_fts(store_visits_fts) VALUES ('rebuild')"))
+            elif engine.dialect.name == "postgresql":
+                for ddl in _POSTGRES_DDL:
+                    conn.execute(text(ddl))
+    except Exception as e:
+        print(f"Error creating search index: {e}")
+
+def _terms(query):
+    """Splits user input into plain word terms, dropping search-syntax characters."""
+    return re.findall(r"\w+", query or "")
+
+def _sqlite_search(session, terms, limit, offset):
+    # Every term must match, each as a prefix ("ordar" matches "ordars")
+    match = " ".join(f'"{t}"*' for t in terms)
+    total = session.execute(text("SELECT count(*) FROM store_visits_fts WHERE store_visits_fts MATCH :match"), {"match": match}).scalar()
+    rows = session.execute(text(f"""
+        SELECT v.id, v.visit_date, v.sr_name, v.store_name,
+               snippet(store_visits_fts, -1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 16) AS snippet,
+               bm25(store_visits_fts, 2.0, 1.0) AS rank
+        FROM store_visits_fts JOIN store_visits v ON v.id = store_visits_fts.rowid
+        WHERE store_visits_fts MATCH :match
+        ORDER BY rank
+        LIMIT :limit OFFSET :offset
+    """), {"match": match, "limit": limit, "offset": offset}).mappings().all()
+    return total, rows
+
+def _postgres_search(session, terms, limit, offset):
+    tsquery = " & ".join(f"{t}:*" for t in terms)
+    total = session.execute(
+        text("SELECT count(*) FROM store_visits WHERE search_vector @@ to_tsquery('simple', :q)"), {"q": tsquery}
+    ).scalar()
+    rows = session.execute(text(f"""
+        SELECT id, visit_date, sr_name, store_name,
+               ts_headline('simple', concat_ws(' — ', store_name, order_details), q,
+                           'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=20, MinWords=5') AS snippet,
+               rank
+        FROM (
+            SELECT id, visit_date, sr_name, store_name, order_details, q, ts_rank_cd(search_vector, q) AS rank
+            FROM store_visits, to_tsquery('simple', :q) AS q
+            WHERE search_vector @@ q
+            ORDER BY rank DESC
+            LIMIT :limit OFFSET :offset
+        ) page
+        ORDER BY rank DESC
+    """), {"q": tsquery, "limit": limit, "offset": offset}).mappings().all()
+    return total, rows
+
+def search_visits(query, page=1, page_size=20, sticky_key=None):
+    """
+    Searches store names and order details of live visits.
+    Returns: (total matches, list of dicts with id, visit_date, sr_name, store_name, snippet, rank) for `page`
+    """
+    terms = _terms(query)
+    if not terms:
+        return 0, []
+    def read(session):
+        backend = _postgres_search if session.get_bind().dialect.name == "postgresql" else _sqlite_search
+        total, rows = backend(session, terms, page_size, (max(page, 1) - 1) * page_size)
+        return total, [dict(r) for r in rows]
+    try:
+        return run_read(read, sticky_key)
+    except Exception:
+        return 0, []
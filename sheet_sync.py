@@ -0,0 +1,219 @@
+"""
+Incremental sync of the DAILY REPORT Google Sheet into store_visits.
+
+Rows are fetched in pages starting after the per-sheet high-water mark (the last synced
+sheet row, kept in the watermarks table), converted with response_mapping.map_responses()
+in a process pool and upserted in batches keyed by source_key ("<sheet id>:<row>").
+Each batch commits together with the new high-water mark, so an interrupted sync resumes
+where it stopped and re-running it never duplicates visits.
+
+Rows imported before the first sync (by migrate_excel.py, or an older import) must not be
+pulled in again: migrate_excel.py tags them with the same source keys and advances the
+high-water mark, and for older imports the mark can be seeded by hand.
+
+Run once:           python sheet_sync.py
+Run continuously:   SYNC_INTERVAL_SECONDS=300 python sheet_sync.py
+Seed the mark:      python sheet_sync.py --seed <last imported sheet row>
+"""
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import pandas as pd
+
+from database import SessionLocal, StoreVisit, User, VisitProduct, get_watermark, hash_image, init_db, parse_products, set_watermark
+from response_mapping import map_responses
+
+SHEET_ID = os.getenv("SHEET_ID", "1D5FQt26Up0XCbcTRvz911OLFDefBYWSsOubuYn_0Ods")
+CREDENTIALS_FILE = os.getenv("GOOGLE_CREDENTIALS_FILE", "service_account.json")
+SCOPE = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive"
+]
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "500"))
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", "100"))
+SYNC_INTERVAL_SECONDS = int(os.getenv("SYNC_INTERVAL_SECONDS", "0"))
+# Pages fetched and queued for conversion ahead of the one being written, per worker
+SYNC_PAGES_PER_WORKER = int(os.getenv("SYNC_PAGES_PER_WORKER", "2"))
+IMAGE_PLACEHOLDER = "Imported from Google Sheet"
+
+# --- Sheet backends ---
+class GspreadSheetBackend:
+    """Reads the response sheet through gspread with a service account."""
+
+    def __init__(self, sheet_id=SHEET_ID, credentials_file=CREDENTIALS_FILE):
+        import gspread
+        from oauth2client.service_account import ServiceAccountCredentials
+
+        creds = ServiceAccountCredentials.from_json_keyfile_name(credentials_file, SCOPE)
+        self.sheet_id = sheet_id
+        self.worksheet = gspread.authorize(creds).open_by_key(sheet_id).sheet1
+
+    def header(self):
+        return self.worksheet.row_values(1)
+
+    def fetch_rows(self, start_row, limit):
+        """Returns up to `limit` rows starting at 1-based sheet row `start_row`."""
+        return self.worksheet.get(f"{start_row}:{start_row + limit - 1}")
+
+class FakeSheetBackend:
+    """In-memory sheet with the same interface as GspreadSheetBackend, for tests and local runs."""
+
+    def __init__(self, header, rows=None, sheet_id="fake-sheet"):
+        self.sheet_id = sheet_id
+        self._header = list(header)
+        self.rows = [list(r) for r in rows or []]
+        self.fetches = 0
+
+    def append(self, row):
+        self.rows.append(list(row))
+
+    def header(self):
+        return list(self._header)
+
+    def fetch_rows(self, start_row, limit):
+        self.fetches += 1
+        # Sheet row 1 is the header, so data row n is self.rows[n - 2]
+        return [list(r) for r in self.rows[start_row - 2:start_row - 2 + limit]]
+
+class _InlinePool:
+    """Stand-in for a process pool that converts pages in the calling process."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+# --- Conversion (runs in worker processes) ---
+def _convert_page(job):
+    """Maps one page of raw rows to StoreVisit records tagged with their sheet row."""
+    sheet_id, header, first_row, rows = job
+    # The Sheets API trims trailing empty cells, so pad every row to the header width
+    frame = pd.DataFrame([r + [""] * (len(header) - len(r)) for r in rows], columns=header)
+    frame.index = range(first_row, first_row + len(rows))
+    mapped = map_responses(frame, image_placeholder=IMAGE_PLACEHOLDER)
+    records = mapped.to_dict("records")
+    for row_number, record in zip(mapped.index, records):
+        record["source_key"] = f"{sheet_id}:{row_number}"
+    return records, first_row + len(rows) - 1
+
+def _iter_pages(backend, start_row, page_size):
+    while True:
+        rows = backend.fetch_rows(start_row, page_size)
+        if not rows:
+            return
+        yield start_row, rows
+        start_row += len(rows)
+
+def _bounded_map(pool, fn, jobs, max_pending):
+    """Like pool.map(fn, jobs), but never has more than max_pending jobs submitted and unconsumed."""
+    pending = deque()
+    for job in jobs:
+        pending.append(pool.submit(fn, job))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def sheet_watermark(sheet_id):
+    """Name of the watermark holding the last synced row of a sheet."""
+    return f"sheet:{sheet_id}"
+
+def seed_watermark(sheet_id, last_row):
+    """
+    Marks sheet rows up to last_row as already imported, so the next sync starts after them.
+    Never moves an existing mark backwards.
+    Returns: (bool, message)
+    """
+    name = sheet_watermark(sheet_id)
+    session = SessionLocal()
+    try:
+        current = get_watermark(session, name)
+        if current >= last_row:
+            return True, f"Sheet {sheet_id} is already synced up to row {current}"
+        set_watermark(session, name, last_row)
+        session.commit()
+        return True, f"Sheet {sheet_id} marked as synced up to row {last_row}"
+    except Exception as e:
+        session.rollback()
+        return False, str(e)
+    finally:
+        session.close()
+
+# --- Upsert ---
+def _upsert_batch(session, records, usernames):
+    """Inserts new synced rows and updates ones already present, matched by source_key."""
+    keys = [r["source_key"] for r in records]
+    existing = {v.source_key: v for v in session.query(StoreVisit).filter(StoreVisit.source_key.in_(keys))}
+    for record in records:
+        record["username"] = usernames.get(str(record["sr_name"]).upper(), record["username"])
+        visit = existing.get(record["source_key"])
+        if visit is None:
+            visit = StoreVisit()
+            session.add(visit)
+        for field, value in record.items():
+            # Keep lead statuses edited in the app (version > 1) rather than resetting them from the sheet
+            if field == "lead_type" and (visit.version or 1) > 1:
+                continue
+            setattr(visit, field, value)
+        visit.image_hash = hash_image(visit.image_data)
+        visit.product_tags = [VisitProduct(product=p) for p in parse_products(visit.products)]
+
+def sync_sheet(backend, page_size=SYNC_PAGE_SIZE, batch_size=SYNC_BATCH_SIZE, workers=None, full=False):
+    """
+    Pulls sheet rows after the high-water mark (or all rows when full=True) into store_visits.
+    workers: process pool size (None = CPU count, 0 = convert in this process)
+    Returns: (bool, message)
+    """
+    watermark = sheet_watermark(backend.sheet_id)
+    session = SessionLocal()
+    synced = 0
+    try:
+        header = backend.header()
+        last_row = 1 if full else max(get_watermark(session, watermark), 1)  # Row 1 is the header
+        # SR names in the sheet are matched to app users by full name
+        usernames = {(u.full_name or "").upper(): u.username for u in session.query(User)}
+
+        # Pages are fetched lazily, only as fast as the window of pending conversions drains
+        jobs = ((backend.sheet_id, header, first, rows) for first, rows in _iter_pages(backend, last_row + 1, page_size))
+        pool = _InlinePool() if workers == 0 else ProcessPoolExecutor(max_workers=workers)
+        max_pending = 1 if workers == 0 else max(SYNC_PAGES_PER_WORKER * (workers or os.cpu_count() or 1), 1)
+        with pool:
+            for records, page_last_row in _bounded_map(pool, _convert_page, jobs, max_pending):
+                for start in range(0, max(len(records), 1), batch_size):
+                    batch = records[start:start + batch_size]
+                    _upsert_batch(session, batch, usernames)
+                    is_last_batch = start + batch_size >= len(records)
+                    batch_last_row = page_last_row if is_last_batch else int(batch[-1]["source_key"].rsplit(":", 1)[1])
+                    set_watermark(session, watermark, batch_last_row)
+                    session.commit()
+                    synced += len(batch)
+                last_row = page_last_row
+        return True, f"Synced {synced} row(s) from sheet {backend.sheet_id} up to row {last_row}"
+    except Exception as e:
+        session.rollback()
+        return False, f"Synced {synced} row(s) before error: {e}"
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    init_db()
+    if sys.argv[1:2] == ["--seed"]:
+        ok, msg = seed_watermark(SHEET_ID, int(sys.argv[2]))
+        print(msg)
+        sys.exit(0 if ok else 1)
+    backend = GspreadSheetBackend()
+    while True:
+        ok, msg = sync_sheet(backend)
+        print(msg)
+        if not SYNC_INTERVAL_SECONDS:
+            break
+        time.sleep(SYNC_INTERVAL_SECONDS)
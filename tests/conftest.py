@@ -0,0 +1,59 @@
+"""
+Tests run against a temporary copy of the bundled field_sales.db.
+
+database.py builds its engine at import time, so DATABASE_URL is pointed at the copy
+before any app module is imported.
+"""
+import itertools
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_db_dir = tempfile.mkdtemp(prefix="field_sales_test_")
+shutil.copy(os.path.join(ROOT, "field_sales.db"), _db_dir)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'field_sales.db')}"
+os.environ.pop("DATABASE_READ_URLS", None)
+
+@pytest.fixture(scope="session", autouse=True)
+def db():
+    from database import init_db
+
+    init_db()
+    yield
+    shutil.rmtree(_db_dir, ignore_errors=True)
+
+@pytest.fixture
+def use_replicas(monkeypatch, tmp_path):
+    """Points the read helpers at local SQLite replicas. Each named replica is a copy of the primary
+    whose store names are all set to its name; "broken" accepts connections but has no tables."""
+    import async_database
+    import database
+
+    def use(*names):
+        engines = []
+        for name in names:
+            path = tmp_path / f"{name}.db"
+            if name != "broken":
+                shutil.copy(database.engine.url.database, path)
+                with sqlite3.connect(path) as conn:
+                    conn.execute("UPDATE store_visits SET store_name = ?", (name,))
+            engines.append(create_engine(f"sqlite:///{path}"))
+        monkeypatch.setattr(database, "read_engines", engines)
+        monkeypatch.setattr(database, "_read_sessions", [sessionmaker(bind=e) for e in engines])
+        monkeypatch.setattr(async_database, "_async_read_sessions", [
+            async_sessionmaker(create_async_engine(async_database.to_async_url(str(e.url))), expire_on_commit=False) for e in engines
+        ])
+        for name, value in [("_replica_cursor", itertools.count()), ("_replica_checked_at", {}),
+                            ("_replica_down_until", {}), ("_last_write_at", {})]:
+            monkeypatch.setattr(database, name, value)
+    return use
@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+
+from database import SessionLocal, StoreVisitArchive, archive_old_visits, save_visit
+from route_analytics import get_daily_routes, refresh_daily_routes
+
+def _save(visit_date, sr_name):
+    ok, msg = save_visit({
+        "date": visit_date.isoformat(), "time": "10:00:00", "sr_name": sr_name, "username": None,
+        "store_name": "Archive Test Store", "visit_type": "NEW VISIT", "store_category": "MT", "phone": "",
+        "lead_type": "COLD", "follow_up_date": "", "products": "CIGARS", "order_details": "",
+        "latitude": "", "longitude": "", "maps_url": "", "location_recorded_answer": "NO", "image_data": "x",
+    })
+    assert ok, msg
+    return int(msg.rsplit(" ", 1)[1])
+
+def test_ids_are_not_reused_after_archiving_the_newest_visit():
+    old_date = date(2001, 1, 1)
+    archived_id = _save(old_date, "ARCHIVE TEST OLD")
+    assert refresh_daily_routes()[0]  # Route watermark now covers archived_id
+
+    ok, msg = archive_old_visits(days=(date.today() - old_date).days - 1)
+    assert ok and msg.startswith("Archived 1 "), msg
+    session = SessionLocal()
+    try:
+        assert session.get(StoreVisitArchive, (archived_id, old_date)) is not None
+    finally:
+        session.close()
+
+    new_id = _save(date.today(), "ARCHIVE TEST NEW")
+    assert new_id > archived_id
+    ok, msg = refresh_daily_routes()
+    assert ok and msg != "Routes are up to date", msg
+    assert len(get_daily_routes(sr_name="ARCHIVE TEST NEW")) == 1
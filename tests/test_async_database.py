@@ -0,0 +1,25 @@
+import threading
+
+import async_database
+import database
+from async_database import gather, get_all_store_names, get_visit_kpis, run
+
+def test_gather_reads_from_replicas(use_replicas):
+    use_replicas("replica-a", "replica-b")
+    results = run(gather(first=get_all_store_names(), second=get_all_store_names()))
+    assert sorted(results.values()) == [["replica-a"], ["replica-b"]]
+
+def test_failed_replica_query_falls_back_to_primary(use_replicas):
+    use_replicas("broken")
+    kpis = run(get_visit_kpis())
+    assert kpis["total_visits"] > 0
+    assert 0 in database._replica_down_until
+
+def test_replica_health_check_runs_off_the_event_loop(monkeypatch):
+    threads = []
+    def pick_replica(sticky_key=None):
+        threads.append(threading.current_thread().name)
+        return None
+    monkeypatch.setattr(async_database, "pick_replica", pick_replica)
+    run(gather(stores=get_all_store_names(), kpis=get_visit_kpis()))
+    assert len(threads) == 2 and "async-db" not in threads
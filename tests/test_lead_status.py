@@ -0,0 +1,23 @@
+from database import SessionLocal, StoreVisit, update_lead_statuses
+
+def _visit():
+    session = SessionLocal()
+    try:
+        return session.query(StoreVisit.id, StoreVisit.lead_type, StoreVisit.version).order_by(StoreVisit.id).first()
+    finally:
+        session.close()
+
+def test_stale_and_missing_visits_are_reported():
+    visit = _visit()
+    change = {"visit_id": visit.id, "old_status": visit.lead_type, "new_status": "HOT", "version": visit.version}
+    missing = {"visit_id": 10**9, "old_status": "COLD", "new_status": "HOT", "version": 1}
+
+    ok, result = update_lead_statuses([change, missing], changed_by="test")
+    assert ok, result
+    assert result["updated"] == [visit.id]
+    assert result["conflicts"] == [{"visit_id": 10**9, "lead_type": None, "version": None}]
+
+    # Same loaded version again: the row has moved on, so it is a conflict with the stored status
+    ok, result = update_lead_statuses([dict(change, new_status="DEAD")], changed_by="test")
+    assert ok, result
+    assert result == {"updated": [], "conflicts": [{"visit_id": visit.id, "lead_type": "HOT", "version": visit.version + 1}]}
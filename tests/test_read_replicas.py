@@ -0,0 +1,28 @@
+import database
+from database import get_all_store_names, get_all_visits, mark_write
+from search import search_visits
+
+def test_reads_round_robin_between_replicas(use_replicas):
+    use_replicas("replica-a", "replica-b")
+    assert [get_all_store_names() for _ in range(3)] == [["replica-a"], ["replica-b"], ["replica-a"]]
+
+def test_recent_writer_reads_from_primary(use_replicas):
+    use_replicas("replica-a", "replica-b")
+    mark_write("sr_user")
+    primary = get_all_store_names(sticky_key="sr_user")
+    assert primary and "replica-a" not in primary and "replica-b" not in primary
+    assert get_all_store_names(sticky_key="other_user") == ["replica-a"]
+
+def test_failed_replica_query_falls_back_to_primary(use_replicas):
+    use_replicas("broken", "replica-a")
+    visits = get_all_visits()  # Runs on "broken" first
+    assert visits and {v.store_name for v in visits} != {"replica-a"}
+    assert 0 in database._replica_down_until and 1 not in database._replica_down_until
+    # The broken replica is skipped until REPLICA_RETRY_SECONDS have passed
+    assert [get_all_store_names() for _ in range(2)] == [["replica-a"], ["replica-a"]]
+
+def test_failed_replica_search_falls_back_to_primary(use_replicas):
+    use_replicas("broken")
+    total, rows = search_visits("store")
+    assert total > 0 and rows
+    assert 0 in database._replica_down_until
@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+from database import SessionLocal, StoreVisit, get_watermark
+from route_analytics import WATERMARK_NAME, compute_daily_routes, get_daily_routes, refresh_daily_routes
+
+def test_refresh_on_shipped_db_advances_watermark():
+    ok, msg = refresh_daily_routes(full=True)
+    assert ok, msg
+    session = SessionLocal()
+    try:
+        max_id = max(v.id for v in session.query(StoreVisit.id))
+        assert get_watermark(session, WATERMARK_NAME) == max_id
+    finally:
+        session.close()
+    assert refresh_daily_routes() == (True, "Routes are up to date")
+    assert not get_daily_routes().empty
+
+def test_legs_skip_invalid_and_placeholder_coordinates():
+    visits = pd.DataFrame({
+        "sr_name": "RAJU DAS", "username": "raju", "visit_date": pd.Timestamp("2026-01-21").date(),
+        "visit_time": ["10:00:00", "10:30:00.250000", "11:00:00", "11:30:00", "12:00:00"],
+        "latitude": [26.15, 1.0, 91.78, 26.16, None],
+        "longitude": [91.77, 1.0, 1.0, 91.77, 91.77],
+    })
+    route = compute_daily_routes(visits).iloc[0]
+    assert route["visits"] == 5 and route["located_visits"] == 2
+    assert 1.0 < route["distance_km"] < 1.2  # Only the leg between the two real fixes
+    assert route["mean_gap_min"] == pytest.approx(30)
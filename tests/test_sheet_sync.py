@@ -0,0 +1,74 @@
+import pytest
+
+from database import SessionLocal, StoreVisit, get_watermark
+from response_mapping import LOCATION_COLUMN, PRODUCTS_COLUMN, STORE_COLUMN
+from sheet_sync import FakeSheetBackend, seed_watermark, sheet_watermark, sync_sheet
+
+HEADER = ['Timestamp', STORE_COLUMN, 'PHONE NUMBER', 'TIME', PRODUCTS_COLUMN, LOCATION_COLUMN,
+          'SR NAME', 'LEAD TYPE', 'DATE', 'LATITUDE', 'LONGITUDE']
+
+def _row(n, lead_type="COLD"):
+    return ['01/02/2026 10:00:00', f'Store {n}', '9800000000', '10:00:00', 'CIGARETTE, HOOKAH', 'YES',
+            'RAJU DAS', lead_type, '01/02/2026', '26.16', '91.77']
+
+def _synced(sheet_id):
+    session = SessionLocal()
+    try:
+        visits = session.query(StoreVisit).filter(StoreVisit.source_key.like(f"{sheet_id}:%")).all()
+        return {v.source_key: v.lead_type for v in visits}, get_watermark(session, sheet_watermark(sheet_id))
+    finally:
+        session.close()
+
+class FailingSheetBackend(FakeSheetBackend):
+    """Fails on the n-th fetch, like a dropped connection in the middle of a sync."""
+
+    def __init__(self, *args, fail_on_fetch, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail_on_fetch = fail_on_fetch
+
+    def fetch_rows(self, start_row, limit):
+        if self.fetches + 1 == self.fail_on_fetch:
+            self.fetches += 1
+            raise ConnectionError("connection reset")
+        return super().fetch_rows(start_row, limit)
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_sync_inserts_rows_and_advances_watermark(workers):
+    backend = FakeSheetBackend(HEADER, [_row(n) for n in range(7)], sheet_id=f"insert-{workers}")
+    ok, msg = sync_sheet(backend, page_size=3, batch_size=2, workers=workers)
+    assert ok, msg
+    visits, mark = _synced(backend.sheet_id)
+    assert sorted(visits) == [f"{backend.sheet_id}:{row}" for row in range(2, 9)]
+    assert mark == 8
+
+def test_sync_resumes_after_interruption():
+    rows = [_row(n) for n in range(6)]
+    failing = FailingSheetBackend(HEADER, rows, sheet_id="resume", fail_on_fetch=2)
+    ok, msg = sync_sheet(failing, page_size=3, workers=0)
+    assert not ok
+    visits, mark = _synced("resume")
+    assert len(visits) == 3 and mark == 4  # The first page was committed
+
+    backend = FakeSheetBackend(HEADER, rows, sheet_id="resume")
+    ok, msg = sync_sheet(backend, page_size=3, workers=0)
+    assert ok, msg
+    visits, mark = _synced("resume")
+    assert len(visits) == 6 and mark == 7
+
+def test_sync_is_idempotent():
+    backend = FakeSheetBackend(HEADER, [_row(n) for n in range(4)], sheet_id="idempotent")
+    assert sync_sheet(backend, page_size=3, workers=0)[0]
+    assert sync_sheet(backend, page_size=3, workers=0)[0]  # Nothing new after the watermark
+    backend.rows[1] = _row(1, lead_type="HOT")
+    assert sync_sheet(backend, page_size=3, workers=0, full=True)[0]  # Re-reads every row
+    visits, mark = _synced("idempotent")
+    assert len(visits) == 4 and mark == 5
+    assert visits["idempotent:3"] == "HOT"
+
+def test_seeded_watermark_skips_imported_rows():
+    backend = FakeSheetBackend(HEADER, [_row(n) for n in range(5)], sheet_id="seeded")
+    assert seed_watermark("seeded", 4)[0]
+    assert seed_watermark("seeded", 2)[0]  # Never moves backwards
+    assert sync_sheet(backend, workers=0)[0]
+    visits, mark = _synced("seeded")
+    assert sorted(visits) == ["seeded:5", "seeded:6"] and mark == 6
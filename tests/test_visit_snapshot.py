@@ -0,0 +1,45 @@
+import numpy as np
+
+from database import SessionLocal, StoreVisit, get_visit_details, update_lead_statuses
+from visit_snapshot import get_visit_snapshot
+
+def test_snapshot_builds_from_shipped_db():
+    snapshot = get_visit_snapshot(force_rebuild=True)
+    session = SessionLocal()
+    try:
+        visits = session.query(StoreVisit).order_by(StoreVisit.id).all()
+    finally:
+        session.close()
+    frame = snapshot.frame
+    assert len(frame) == len(visits) > 0
+    # Times with and without microseconds both survive, truncated to the second
+    expected = [np.datetime64(f"{v.visit_date}T{v.visit_time.replace(microsecond=0)}", "s") for v in visits]
+    assert (frame["visit_at"].to_numpy() == np.array(expected)).all()
+    assert list(snapshot.store_names(frame["store_id"])) == [v.store_name for v in visits]
+
+def test_own_lead_edit_refreshes_snapshot():
+    snapshot = get_visit_snapshot(force_rebuild=True)
+    row = snapshot.frame.iloc[0]
+    new_status = "DEAD" if row["lead_type"] != "DEAD" else "WARM"
+    change = {"visit_id": int(row["id"]), "old_status": row["lead_type"], "new_status": new_status, "version": int(row["version"])}
+    ok, result = update_lead_statuses([change], changed_by="snapshot_user")
+    assert ok and result["updated"] == [int(row["id"])]
+
+    assert get_visit_snapshot() is snapshot  # Others keep the cached snapshot until it is due
+    refreshed = get_visit_snapshot(sticky_key="snapshot_user")
+    assert refreshed is not snapshot
+    edited = refreshed.frame.iloc[0]
+    assert edited["lead_type"] == new_status and edited["version"] == row["version"] + 1
+    assert get_visit_snapshot(sticky_key="snapshot_user") is refreshed
+
+def test_visit_details_cover_display_only_fields():
+    view = get_visit_snapshot().newest_first()
+    details = get_visit_details(view["id"].head(3))
+    session = SessionLocal()
+    try:
+        for visit_id in view["id"].head(3):
+            visit = session.get(StoreVisit, int(visit_id))
+            assert details[int(visit_id)].phone_number == visit.phone_number
+            assert details[int(visit_id)].maps_url == visit.maps_url
+    finally:
+        session.close()
@@ -0,0 +1,96 @@
+"""
+Server-side clustering of visit locations for the admin map.
+
+Visit points are binned on a Web-Mercator grid whose cell size halves with every
+zoom level (CELLS_PER_TILE x CELLS_PER_TILE cells per 256px map tile), so the browser
+only receives one marker per occupied cell instead of every visit.
+Points are cached per (date range, SR) and clusters per (date range, SR, zoom) for
+MAP_CACHE_SECONDS.
+"""
+import os
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from database import StoreVisit, has_valid_location, run_read
+
+CELLS_PER_TILE = 8
+MIN_ZOOM, MAX_ZOOM = 1, 18
+MAP_CACHE_SECONDS = int(os.getenv("MAP_CACHE_SECONDS", "300"))
+# Mercator is undefined at the poles; clamp like web map tiles do.
+MAX_LATITUDE = 85.05112878
+EARTH_CIRCUMFERENCE_M = 40_075_016.686
+
+def _cache_bucket():
+    return int(time.time() // MAP_CACHE_SECONDS)
+
+@lru_cache(maxsize=32)
+def _load_points(date_from, date_to, sr_name, bucket):
+    def read(session):
+        query = session.query(StoreVisit.latitude, StoreVisit.longitude).filter(
+            has_valid_location(StoreVisit.latitude, StoreVisit.longitude)
+        )
+        if date_from:
+            query = query.filter(StoreVisit.visit_date >= date_from)
+        if date_to:
+            query = query.filter(StoreVisit.visit_date <= date_to)
+        if sr_name:
+            query = query.filter(StoreVisit.sr_name == sr_name)
+        return query.all()
+    try:
+        points = np.array(run_read(read), dtype=np.float64).reshape(-1, 2)
+    except Exception:
+        points = np.empty((0, 2))
+    points.flags.writeable = False
+    return points
+
+def to_mercator(lat, lon):
+    """Projects degrees to normalised Web-Mercator coordinates in [0, 1] (y grows southwards)."""
+    lat_rad = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    x = (lon + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / np.pi) / 2.0
+    return np.clip(x, 0.0, 1.0), np.clip(y, 0.0, 1.0)
+
+def cluster_points(lat, lon, zoom):
+    """
+    Bins points into grid cells for `zoom` and returns one row per occupied cell.
+    Returns: DataFrame with latitude, longitude (cell centroid), count, tile_x, tile_y
+    """
+    cells = 2 ** zoom * CELLS_PER_TILE
+    x, y = to_mercator(lat, lon)
+    cell_x = np.minimum((x * cells).astype(np.int64), cells - 1)
+    cell_y = np.minimum((y * cells).astype(np.int64), cells - 1)
+    keys, inverse, counts = np.unique(cell_x * cells + cell_y, return_inverse=True, return_counts=True)
+    return pd.DataFrame({
+        "latitude": np.bincount(inverse, weights=lat) / counts,
+        "longitude": np.bincount(inverse, weights=lon) / counts,
+        "count": counts,
+        "tile_x": (keys // cells) // CELLS_PER_TILE,
+        "tile_y": (keys % cells) // CELLS_PER_TILE,
+    })
+
+@lru_cache(maxsize=128)
+def _clusters(date_from, date_to, sr_name, zoom, bucket):
+    points = _load_points(date_from, date_to, sr_name, bucket)
+    return cluster_points(points[:, 0], points[:, 1], zoom)
+
+def get_visit_clusters(zoom, date_from=None, date_to=None, sr_name=None, bounds=None):
+    """
+    Returns clustered visit locations for a zoom level, optionally limited to a viewport.
+    bounds: (south, west, north, east) in degrees, or None for everything.
+    The returned frame is shared through the cache; do not modify it in place.
+    """
+    zoom = int(min(max(zoom, MIN_ZOOM), MAX_ZOOM))
+    clusters = _clusters(date_from, date_to, sr_name, zoom, _cache_bucket())
+    if bounds is None:
+        return clusters
+    south, west, north, east = bounds
+    return clusters[
+        clusters["latitude"].between(south, north) & clusters["longitude"].between(west, east)
+    ]
+
+def cell_size_m(zoom, latitude=0.0):
+    """Approximate width in metres of a grid cell at `zoom` and `latitude`."""
+    return EARTH_CIRCUMFERENCE_M * np.cos(np.radians(latitude)) / (2 ** zoom * CELLS_PER_TILE)
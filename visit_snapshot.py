@@ -0,0 +1,168 @@
+"""
+Compact, shared in-memory snapshot of live visits for dashboard analytics.
+
+Instead of a DataFrame of ORM objects and Python strings/dates, visits are held in a
+typed columnar frame: categoricals for low-cardinality fields, datetime64 for dates,
+float32 coordinates, an int32 store_id into `stores` and a uint8 bitmask of PRODUCTS.
+One snapshot per process is shared by every Streamlit session; refreshes build a new
+frame and swap the reference, so a snapshot a page is using never changes under it.
+Treat `frame` as read-only. Display-only text (phone numbers, map links) is not kept;
+pages load it for the rows they show with database.get_visit_details().
+"""
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+
+from database import PRODUCTS, LeadStatusHistory, StoreVisit, run_read, wrote_since
+
+# Incremental refresh (new visits only) at most this often...
+SNAPSHOT_REFRESH_SECONDS = int(os.getenv("SNAPSHOT_REFRESH_SECONDS", "30"))
+# ...and a full rebuild (picks up other edits and archived rows) at most this often.
+# Lead status changes are replayed from lead_status_history on every refresh.
+SNAPSHOT_REBUILD_SECONDS = int(os.getenv("SNAPSHOT_REBUILD_SECONDS", "3600"))
+
+CATEGORY_COLUMNS = ["sr_name", "username", "lead_type", "store_category", "visit_type"]
+_SOURCE_COLUMNS = [
+    StoreVisit.id, StoreVisit.visit_date, StoreVisit.visit_time, StoreVisit.store_name,
+    StoreVisit.products, StoreVisit.follow_up_on, StoreVisit.latitude, StoreVisit.longitude, StoreVisit.version,
+] + [getattr(StoreVisit, c) for c in CATEGORY_COLUMNS]
+
+@dataclass(frozen=True)
+class VisitSnapshot:
+    frame: pd.DataFrame   # one row per visit, see build_frame()
+    stores: pd.Index      # store names; frame.store_id indexes into it
+    max_id: int           # highest visit id included
+    history_id: int       # highest lead_status_history id applied
+    built_at: float       # time.monotonic() of the last full rebuild
+    refreshed_at: float   # time.monotonic() of the last refresh
+
+    def store_names(self, store_ids):
+        """Maps store_id values back to store names."""
+        return self.stores.take(np.asarray(store_ids))
+
+    def has_product(self, product):
+        """Boolean mask of visits tagged with `product`."""
+        return (self.frame["product_mask"] & np.uint8(1 << PRODUCTS.index(product))) != 0
+
+    def newest_first(self, rows=None):
+        """Visits (all, or where boolean mask `rows` is True) newest first, with store_name mapped back from store_id."""
+        frame = self.frame if rows is None else self.frame[rows]
+        frame = frame.sort_values(["visit_at", "id"], ascending=False)
+        return frame.assign(store_name=np.asarray(self.store_names(frame["store_id"])))
+
+    @property
+    def nbytes(self):
+        return int(self.frame.memory_usage(deep=True).sum())
+
+def product_mask(products):
+    """Vectorized bitmask (bit i = PRODUCTS[i]) from comma-joined product strings."""
+    products = products.fillna("").str.upper()
+    mask = np.zeros(len(products), dtype=np.uint8)
+    for bit, product in enumerate(PRODUCTS):
+        mask |= products.str.contains(rf"(?:^|,)\s*{re.escape(product)}\s*(?:,|$)").to_numpy(dtype=np.uint8) << bit
+    return mask
+
+def _load_rows(after_id=0, sticky_key=None):
+    query = select(*_SOURCE_COLUMNS).where(StoreVisit.id > after_id).order_by(StoreVisit.id)
+    return pd.DataFrame(run_read(lambda session: session.execute(query).all(), sticky_key), columns=[c.key for c in _SOURCE_COLUMNS])
+
+def _max_history_id(sticky_key=None):
+    return run_read(lambda session: session.query(func.max(LeadStatusHistory.id)).scalar(), sticky_key) or 0
+
+def _load_status_changes(after_id, sticky_key=None):
+    query = (
+        select(LeadStatusHistory.id, LeadStatusHistory.visit_id, LeadStatusHistory.new_status, LeadStatusHistory.version)
+        .where(LeadStatusHistory.id > after_id)
+        .order_by(LeadStatusHistory.id)
+    )
+    return pd.DataFrame(run_read(lambda session: session.execute(query).all(), sticky_key), columns=["id", "visit_id", "new_status", "version"])
+
+def _apply_status_changes(frame, changes):
+    """Returns `frame` with lead_type and version set to the latest change per visit in `changes`."""
+    latest = changes.drop_duplicates("visit_id", keep="last").set_index("visit_id")
+    positions = pd.Index(frame["id"]).get_indexer(latest.index)
+    found = positions >= 0
+    new_status = latest["new_status"]
+    lead_type = frame["lead_type"].cat.add_categories(pd.Index(new_status.unique()).difference(frame["lead_type"].cat.categories))
+    lead_type.iloc[positions[found]] = new_status.to_numpy()[found]
+    version = frame["version"].copy()
+    version.iloc[positions[found]] = latest["version"].to_numpy(dtype=np.int32)[found]
+    return frame.assign(lead_type=lead_type, version=version)
+
+def build_frame(rows, stores):
+    """
+    Converts raw visit rows to the compact layout.
+    `stores` is extended with any new store names; existing store_ids never change.
+    Returns: (frame, stores)
+    """
+    stores = stores.append(pd.Index(rows["store_name"].unique()).difference(stores))
+    frame = pd.DataFrame({
+        "id": rows["id"].astype(np.int32),
+        # Time added as a duration: visit_time strings only carry microseconds when they are non-zero
+        "visit_at": (pd.to_datetime(rows["visit_date"]) + pd.to_timedelta(rows["visit_time"].astype(str))).astype("datetime64[s]"),
+        "follow_up_on": pd.to_datetime(rows["follow_up_on"]).astype("datetime64[s]"),
+        "store_id": stores.get_indexer(rows["store_name"]).astype(np.int32),
+        "product_mask": product_mask(rows["products"]),
+        "latitude": rows["latitude"].astype(np.float32),
+        "longitude": rows["longitude"].astype(np.float32),
+        "version": rows["version"].astype(np.int32),
+    })
+    for column in CATEGORY_COLUMNS:
+        frame[column] = rows[column].astype("category")
+    return frame, stores
+
+def _append(snapshot, rows):
+    new, stores = build_frame(rows, snapshot.stores)
+    frame = snapshot.frame
+    # Align categories so concat keeps categorical dtypes instead of falling back to object
+    for column in CATEGORY_COLUMNS:
+        categories = frame[column].cat.categories.union(new[column].cat.categories)
+        frame = frame.assign(**{column: frame[column].cat.set_categories(categories)})
+        new[column] = new[column].cat.set_categories(categories)
+    return pd.concat([frame, new], ignore_index=True), stores
+
+_snapshot = None
+_lock = threading.Lock()
+
+def _is_fresh(snapshot, now, sticky_key):
+    return (
+        snapshot is not None
+        and now - snapshot.refreshed_at < SNAPSHOT_REFRESH_SECONDS
+        and not wrote_since(sticky_key, snapshot.refreshed_at)
+    )
+
+def get_visit_snapshot(force_rebuild=False, sticky_key=None):
+    """
+    Returns the shared snapshot, refreshing it first if it is older than SNAPSHOT_REFRESH_SECONDS
+    or if `sticky_key` (usually the username) wrote since the last refresh, so callers see their own edits.
+    """
+    global _snapshot
+    now = time.monotonic()
+    if not force_rebuild and _is_fresh(_snapshot, now, sticky_key):
+        return _snapshot
+    with _lock:
+        current = _snapshot
+        if not force_rebuild and _is_fresh(current, now, sticky_key):
+            return current  # Another session refreshed while we waited
+        if current is None or force_rebuild or now - current.built_at >= SNAPSHOT_REBUILD_SECONDS:
+            # Read the history mark first: changes made while rows load are replayed next time
+            history_id = _max_history_id(sticky_key)
+            frame, stores = build_frame(_load_rows(sticky_key=sticky_key), pd.Index([], dtype=object))
+            built_at = now
+        else:
+            rows = _load_rows(after_id=current.max_id, sticky_key=sticky_key)
+            frame, stores = _append(current, rows) if not rows.empty else (current.frame, current.stores)
+            history_id, built_at = current.history_id, current.built_at
+            changes = _load_status_changes(history_id, sticky_key)
+            if not changes.empty:
+                frame = _apply_status_changes(frame, changes)
+                history_id = int(changes["id"].max())
+        max_id = int(frame["id"].max()) if not frame.empty else 0
+        _snapshot = VisitSnapshot(frame, stores, max_id, history_id, built_at, now)
+        return _snapshot